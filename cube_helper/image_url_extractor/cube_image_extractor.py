@@ -8,28 +8,80 @@ Cube Cobra APIからキューブリストの画像URLを取得するスクリプ
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import sys
 import argparse
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import filterfalse
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+# orjson があれば高速な方を使う（バイト列を直接受け取れる。無ければ標準の json）
+# orjson.JSONDecodeError は json.JSONDecodeError のサブクラスなので例外処理は共通
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# URL例: https://www.cubecobra.com/cube/list/48c4bc57-d95c-4226-9c4d-05f140bed38c
+_CUBE_ID_RE = re.compile(r'/cube/list/([a-f0-9-]+)')
+
+# colors（1色）から色カテゴリへの対応表
+_COLOR_MAPPING = {
+    'W': 'White',
+    'U': 'Blue',
+    'B': 'Black',
+    'R': 'Red',
+    'G': 'Green',
+}
+
+# 表面画像URLを探す details のキー（優先順）
+_DETAILS_IMAGE_KEYS = ('image_normal', 'image_small', 'art_crop')
+# details.image_uris（または card_faces[0].image_uris）で参照するキー（優先順）
+_IMAGE_URIS_KEYS = ('normal', 'large', 'small')
+
+# APIリクエストのタイムアウト（接続, 読み込み）秒
+# 接続できないホストで長く待たないよう接続側だけ短くする（大きなキューブJSONの読み込みは従来通り30秒）
+_API_TIMEOUT = (5, 30)
+
+# 取得したキューブJSONのキャッシュ保存先
+_CACHE_DIR = Path.home() / '.cache' / 'cube_helper'
+# キャッシュ検証用のレスポンスヘッダー → 条件付きリクエストのヘッダー
+_CACHE_VALIDATORS = {
+    'ETag': 'If-None-Match',
+    'Last-Modified': 'If-Modified-Since',
+}
+
 
 class CubeCobraAPIExtractor:
     """Cube Cobra APIからカードイメージURLを抽出するクラス"""
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True, refresh_cache: bool = False):
+        # use_cache=False: キャッシュの読み書きをしない / refresh_cache=True: キャッシュを無視して再取得し上書き
+        self.use_cache = use_cache
+        self.refresh_cache = refresh_cache
+        self.cache_dir = _CACHE_DIR
+        
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # 接続を使い回し、一時的なエラー（429/5xx）は自動リトライする
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+        )
+        self.session.mount('https://', adapter)
 
     def extract_cube_id_from_url(self, cube_url: str) -> str:
         """URLからキューブIDを抽出"""
-        # URL例: https://www.cubecobra.com/cube/list/48c4bc57-d95c-4226-9c4d-05f140bed38c
-        match = re.search(r'/cube/list/([a-f0-9-]+)', cube_url)
+        match = _CUBE_ID_RE.search(cube_url)
         if match:
             return match.group(1)
         else:
@@ -40,12 +92,39 @@ class CubeCobraAPIExtractor:
         
         api_url = f"https://cubecobra.com/cube/api/cubeJSON/{cube_id}"
         
+        cache_path = self.cache_dir / f"{cube_id}.json"
+        meta_path = cache_path.with_suffix('.meta.json')
+        
         try:
+            # キャッシュがあれば ETag / Last-Modified で条件付きリクエスト（変更がなければ 304 で本文なし）
+            headers = {}
+            if self.use_cache and not self.refresh_cache:
+                headers = self._load_conditional_headers(cache_path, meta_path)
+            
             print(f"APIからデータを取得中: {api_url}")
-            response = self.session.get(api_url, timeout=30)
+            response = self.session.get(api_url, headers=headers, timeout=_API_TIMEOUT)
+            
+            if response.status_code == 304:
+                try:
+                    cube_data = _json_loads(cache_path.read_bytes())
+                    print(f"📦 キャッシュを使用: {cache_path}")
+                    return cube_data
+                except (OSError, ValueError) as e:
+                    # メタ情報だけ残ってキャッシュ本体が消えた・壊れた場合は、条件なしで取り直す
+                    print(f"⚠️  キャッシュ読み込みエラー（再取得します）: {e}", file=sys.stderr)
+                    self._remove_cache_meta(meta_path)
+                    response = self.session.get(api_url, timeout=_API_TIMEOUT)
+            
             response.raise_for_status()
             
-            cube_data = response.json()
+            # response.json() は本文全体を str にデコードしてからパースするため、
+            # バイト列のままパーサに渡して余分なコピーを避ける
+            cube_data = _json_loads(response.content)
+            
+            validators = {key: response.headers[key] for key in _CACHE_VALIDATORS if key in response.headers}
+            if self.use_cache and validators:
+                self._save_cache(cache_path, meta_path, response.content, validators)
+            
             return cube_data
             
         except requests.exceptions.RequestException as e:
@@ -55,36 +134,63 @@ class CubeCobraAPIExtractor:
             print(f"JSONデコードエラー: {e}", file=sys.stderr)
             return {}
 
+    def _load_conditional_headers(self, cache_path: Path, meta_path: Path) -> Dict[str, str]:
+        """キャッシュのメタ情報から条件付きリクエスト用ヘッダーを作成"""
+        if not cache_path.exists() or not meta_path.exists():
+            return {}
+        try:
+            validators = json.loads(meta_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            # メタ情報が壊れていれば通常のリクエストにする
+            return {}
+        return {
+            request_header: validators[response_header]
+            for response_header, request_header in _CACHE_VALIDATORS.items()
+            if validators.get(response_header)
+        }
+
+    def _remove_cache_meta(self, meta_path: Path):
+        """キャッシュのメタ情報を削除（次回から条件付きリクエストにしない）"""
+        try:
+            meta_path.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"⚠️  キャッシュ削除エラー: {e}", file=sys.stderr)
+
+    def _save_cache(self, cache_path: Path, meta_path: Path, content: bytes, validators: Dict[str, str]):
+        """キューブJSONと ETag / Last-Modified をキャッシュに保存（一時ファイル経由で置き換え）"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix('.json.tmp')
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, cache_path)
+            tmp_path = meta_path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(validators), encoding='utf-8')
+            os.replace(tmp_path, meta_path)
+        except OSError as e:
+            # キャッシュ保存に失敗しても取得結果はそのまま使う
+            print(f"⚠️  キャッシュ保存エラー: {e}", file=sys.stderr)
+
     def get_card_color_category(self, card: Dict[str, Any]) -> Optional[str]:
         """カードの色カテゴリを取得（新しい優先順位付き）"""
         
         # 1. colorCategory があればそちらを採用（nullでない場合）
-        if card.get('colorCategory') and card.get('colorCategory') != 'null':
-            return card.get('colorCategory')
+        color_category = card.get('colorCategory')
+        if color_category and color_category != 'null':
+            return color_category
         
         # 2. type_line に Land を含むものは Lands に分類
-        type_line = card.get('type_line', '')
-        if 'Land' in type_line:
+        if 'Land' in card.get('type_line', ''):
             return 'Lands'
         
         # 3. colors があり、1色だけであればそちらを採用
         colors = card.get('colors')
-        if colors and isinstance(colors, list) and len(colors) == 1:
-            color_mapping = {
-                'W': 'White',
-                'U': 'Blue', 
-                'B': 'Black',
-                'R': 'Red',
-                'G': 'Green'
-            }
-            single_color = colors[0]
-            if single_color in color_mapping:
-                return color_mapping[single_color]
+        if colors and len(colors) == 1:
+            return _COLOR_MAPPING.get(colors[0])
         
         # 4. colors が null または 2色以上ある場合は、details.colorcategory を採用
-        if colors is None or (isinstance(colors, list) and len(colors) != 1):
-            if 'details' in card and card['details'].get('colorcategory'):
-                return card['details'].get('colorcategory')
+        details = card.get('details')
+        if details:
+            return details.get('colorcategory') or None
         
         # どれも該当しない場合はNone
         return None
@@ -101,10 +207,21 @@ class CubeCobraAPIExtractor:
 
     def has_proxyed_tag(self, card: Dict[str, Any]) -> bool:
         """カードがProxyedタグを持っているかチェック"""
-        tags = card.get('tags', [])
-        if isinstance(tags, list):
-            return 'Proxyed' in tags
-        return False
+        return 'Proxyed' in (card.get('tags') or ())
+
+    def _get_card_name(self, card: Dict[str, Any]) -> str:
+        """表示用のカード名を取得（details.name → name の順）"""
+        card_name = card.get('name', 'Unknown')
+        details = card.get('details')
+        if details:
+            card_name = details.get('name', card_name)
+        return card_name
+
+    def _report_proxyed(self, proxyed_count: int, remaining_count: int):
+        """Proxyedタグ除外の結果を表示"""
+        if proxyed_count > 0:
+            print(f"\n🚫 Proxyedタグ除外: {proxyed_count}枚のカードを除外")
+            print(f"📊 除外後の総カード数: {remaining_count}枚")
 
     def extract_cards_by_color(self, cube_data: Dict[str, Any], target_colors: List[str], exclude_proxyed: bool = False) -> List[Dict[str, Any]]:
         """指定された色カテゴリ（複数可）のカードを抽出"""
@@ -116,49 +233,52 @@ class CubeCobraAPIExtractor:
         all_cards = cube_data['cards']['mainboard']
         matched_cards = []
         unclassified_cards = []
-        proxyed_cards = []
         
-        # Proxyedタグ除外が有効な場合の前処理
-        if exclude_proxyed:
-            original_count = len(all_cards)
-            all_cards = [card for card in all_cards if not self.has_proxyed_tag(card)]
-            proxyed_count = original_count - len(all_cards)
-            if proxyed_count > 0:
-                print(f"\n🚫 Proxyedタグ除外: {proxyed_count}枚のカードを除外")
-                print(f"📊 除外後の総カード数: {len(all_cards)}枚")
-        
-        # 全カード指定の場合
-        if 'all' in [color.lower() for color in target_colors]:
+        # 比較用に正規化（前後の空白除去・小文字化）した指定カテゴリ（カードごとに lower() しない）
+        targets = frozenset(color.strip().lower() for color in target_colors)
+        
+        # 全カード指定の場合は分類処理を一切行わずに返す（Proxyed除外時のみフィルタ済みリストを作る）
+        if 'all' in targets:
+            if exclude_proxyed:
+                original_count = len(all_cards)
+                all_cards = list(filterfalse(self.has_proxyed_tag, all_cards))
+                self._report_proxyed(original_count - len(all_cards), len(all_cards))
             print(f"\n✅ 全カードを抽出: {len(all_cards)}枚")
             return all_cards
         
         # カテゴリ別の統計
         category_counts = {}
+        proxyed_count = 0
         
+        # Proxyedタグ除外は分類と同じループで行い、除外済みリストのコピーを作らない
         for card in all_cards:
+            if exclude_proxyed and self.has_proxyed_tag(card):
+                proxyed_count += 1
+                continue
+            
+            # 色カテゴリはカードごとに1回だけ判定する
             card_color_category = self.get_card_color_category(card)
             
             if card_color_category is None:
-                # 分類できないカードをリストアップ
-                card_name = card.get('name', 'Unknown')
-                if 'details' in card:
-                    card_name = card['details'].get('name', card_name)
-                unclassified_cards.append(card_name)
-            else:
-                # 統計更新
-                category_counts[card_color_category] = category_counts.get(card_color_category, 0) + 1
-                
-                # 指定されたカテゴリのいずれかに一致するかチェック
-                for target_color in target_colors:
-                    if self.check_card_color_category(card, target_color):
-                        matched_cards.append(card)
-                        break
+                # 分類できないカードをリストアップ（名前は表示時に解決する）
+                unclassified_cards.append(card)
+                continue
+            
+            # 統計更新
+            category_counts[card_color_category] = category_counts.get(card_color_category, 0) + 1
+            
+            # 指定されたカテゴリのいずれかに一致するかチェック
+            if card_color_category.lower() in targets:
+                matched_cards.append(card)
+        
+        if exclude_proxyed:
+            self._report_proxyed(proxyed_count, len(all_cards) - proxyed_count)
         
         # 分類できないカードがあれば出力
         if unclassified_cards:
             print(f"\n⚠️  色カテゴリが特定できないカード ({len(unclassified_cards)}枚):")
-            for i, name in enumerate(unclassified_cards, 1):
-                print(f"  {i}: {name}")
+            for i, card in enumerate(unclassified_cards, 1):
+                print(f"  {i}: {self._get_card_name(card)}")
         
         # 統計情報を表示
         if len(target_colors) == 1:
@@ -167,68 +287,90 @@ class CubeCobraAPIExtractor:
             print(f"\n✅ 指定カテゴリ ({', '.join(target_colors)}) のカード: {len(matched_cards)}枚")
             print("\n📊 各カテゴリの内訳:")
             for category, count in sorted(category_counts.items()):
-                if any(self.check_card_color_category({'colorCategory': category}, target_color) for target_color in target_colors):
+                if category.lower() in targets:
                     print(f"  {category}: {count}枚")
         
         return matched_cards
 
-    def extract_image_urls(self, cards: List[Dict[str, Any]]) -> List[str]:
-        """カードリストから画像URLを抽出（両面カード対応）"""
+    def _get_front_image_url(self, card: Dict[str, Any], details: Optional[Dict[str, Any]]) -> Optional[str]:
+        """表面の画像URLを取得（imgUrl → details の優先キー → image_uris → card_faces[0].image_uris の順）"""
+        
+        image_url = card.get('imgUrl')
+        if image_url:
+            return image_url
+        if not details:
+            return None
+        
+        for key in _DETAILS_IMAGE_KEYS:
+            image_url = details.get(key)
+            if image_url:
+                return image_url
+        
+        try:
+            # 単面カードは image_uris、両面カードは表面の card_faces[0].image_uris を参照
+            image_uris = details.get('image_uris')
+            if not image_uris:
+                card_faces = details.get('card_faces')
+                if card_faces:
+                    image_uris = card_faces[0].get('image_uris')
+            if image_uris:
+                for key in _IMAGE_URIS_KEYS:
+                    image_url = image_uris.get(key)
+                    if image_url:
+                        return image_url
+        except AttributeError:
+            # image_uris / card_faces は常に dict のはずなので、それ以外の壊れたデータは無視
+            pass
+        
+        return None
+
+    def extract_image_urls(self, cards: List[Dict[str, Any]], dedup: bool = False) -> List[str]:
+        """カードリストから画像URLを抽出（両面カード対応、dedup=True で重複URLを除外）"""
         
         image_urls = []
         double_faced_cards = []
+        # 重複除外用（抽出しながら判定するので出現順を保ったまま1パスで済む）
+        seen_urls = set()
+        
+        def add_url(url: str) -> None:
+            if dedup:
+                if url in seen_urls:
+                    return
+                seen_urls.add(url)
+            image_urls.append(url)
         
         for card in cards:
-            card_name = card.get('name', 'Unknown')
-            if 'details' in card:
-                card_name = card['details'].get('name', card_name)
+            details = card.get('details')
             
             # 表面の画像URL取得
-            front_image_url = None
-            if 'imgUrl' in card and card['imgUrl']:
-                front_image_url = card['imgUrl']
-            elif 'details' in card:
-                details = card['details']
-                if 'image_normal' in details and details['image_normal']:
-                    front_image_url = details['image_normal']
-                elif 'image_small' in details and details['image_small']:
-                    front_image_url = details['image_small']
-                elif 'art_crop' in details and details['art_crop']:
-                    front_image_url = details['art_crop']
-                elif 'image_uris' in details:
-                    image_uris = details['image_uris']
-                    if isinstance(image_uris, dict):
-                        front_image_url = image_uris.get('normal', image_uris.get('large', image_uris.get('small')))
-                    elif isinstance(image_uris, str):
-                        front_image_url = image_uris
-            
+            front_image_url = self._get_front_image_url(card, details)
             if front_image_url:
-                image_urls.append(front_image_url)
+                add_url(front_image_url)
             
             # 裏面の画像URL取得（両面カードの場合）
             back_image_url = None
             is_double_faced = False
             
             # imgBackUrl フィールドをチェック
-            if 'imgBackUrl' in card and card['imgBackUrl']:
+            if card.get('imgBackUrl'):
                 back_image_url = card['imgBackUrl']
                 is_double_faced = True
             # details.image_flip フィールドをチェック
-            elif 'details' in card and card['details'].get('image_flip'):
-                back_image_url = card['details']['image_flip']
+            elif details and details.get('image_flip'):
+                back_image_url = details['image_flip']
                 is_double_faced = True
             # layout が transform の場合もチェック
-            elif 'details' in card and card['details'].get('layout') == 'transform':
+            elif details and details.get('layout') == 'transform':
                 is_double_faced = True
                 # image_flip がない場合は、scryfall の back URL を推測
-                if 'image_normal' in card['details']:
-                    normal_url = card['details']['image_normal']
+                normal_url = details.get('image_normal')
+                if normal_url:
                     # front を back に置換
                     back_image_url = normal_url.replace('/front/', '/back/')
             
             if back_image_url and is_double_faced:
-                image_urls.append(back_image_url)
-                double_faced_cards.append(card_name)
+                add_url(back_image_url)
+                double_faced_cards.append(self._get_card_name(card))
         
         # 両面カードの情報を表示
         if double_faced_cards:
@@ -249,9 +391,10 @@ class CubeCobraAPIExtractor:
             # 出力ファイルのパスを調整
             output_path = output_dir / output_file
             
+            # 1行ずつ write せず、まとめて1回で書き込む
             with open(output_path, 'w', encoding='utf-8') as f:
-                for url in image_urls:
-                    f.write(url + '\n')
+                if image_urls:
+                    f.write('\n'.join(image_urls) + '\n')
             
             print(f"\n✅ {len(image_urls)}個の画像URLを {output_path} に保存しました")
             
@@ -265,8 +408,27 @@ class CubeCobraAPIExtractor:
         except Exception as e:
             print(f"ファイル保存エラー: {e}", file=sys.stderr)
 
-    def get_card_images(self, cube_url: str, target_colors: List[str], output_file: str = None, exclude_proxyed: bool = False):
-        """メイン処理：指定された色カテゴリ（複数可）の画像URLを取得"""
+    def fetch_cube_data_concurrently(self, cube_urls: List[str], max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """複数キューブのデータをスレッドで並列取得（{cube_url: cube_data}）"""
+        
+        cube_ids = {}
+        for cube_url in cube_urls:
+            try:
+                cube_ids[cube_url] = self.extract_cube_id_from_url(cube_url)
+            except ValueError:
+                # 無効なURLは get_card_images 側でエラー表示する
+                continue
+        
+        if not cube_ids:
+            return {}
+        
+        # 待ち時間はネットワーク I/O なので、スレッドでリクエストを重ねる
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(cube_ids))) as executor:
+            results = executor.map(self.get_cube_data_via_api, cube_ids.values())
+            return dict(zip(cube_ids.keys(), results))
+
+    def get_card_images(self, cube_url: str, target_colors: List[str], output_file: str = None, exclude_proxyed: bool = False, dedup: bool = False, cube_data: Optional[Dict[str, Any]] = None):
+        """メイン処理：指定された色カテゴリ（複数可）の画像URLを取得（cube_data 指定時はAPI取得を省略）"""
         
         try:
             # URLからキューブIDを抽出
@@ -274,7 +436,8 @@ class CubeCobraAPIExtractor:
             print(f"キューブID: {cube_id}")
             
             # APIからデータを取得
-            cube_data = self.get_cube_data_via_api(cube_id)
+            if cube_data is None:
+                cube_data = self.get_cube_data_via_api(cube_id)
             
             if not cube_data:
                 print("キューブデータの取得に失敗しました", file=sys.stderr)
@@ -295,7 +458,7 @@ class CubeCobraAPIExtractor:
                 return []
             
             # 画像URLを抽出
-            image_urls = self.extract_image_urls(cards)
+            image_urls = self.extract_image_urls(cards, dedup)
             
             # ファイルに保存
             if output_file:
@@ -316,16 +479,23 @@ def main():
                '  %(prog)s "https://www.cubecobra.com/cube/list/48c4bc57-d95c-4226-9c4d-05f140bed38c" --color "White" -o white_cards.txt\n'
                '  %(prog)s "https://cubecobra.com/cube/list/your-cube-id" --color "White,Blue" -o white_blue_cards.txt\n'
                '  %(prog)s "https://cubecobra.com/cube/list/your-cube-id" --color "all" -o all_cards.txt\n'
-               '  %(prog)s "https://cubecobra.com/cube/list/your-cube-id" --color "White" --exclude-proxyed -o white_no_proxy.txt',
+               '  %(prog)s "https://cubecobra.com/cube/list/your-cube-id" --color "White" --exclude-proxyed -o white_no_proxy.txt\n'
+               '  %(prog)s "https://cubecobra.com/cube/list/cube-a" "https://cubecobra.com/cube/list/cube-b" --color "all"',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
-    parser.add_argument('url', help='Cube CobraのキューブリストURL')
+    parser.add_argument('url', nargs='+', help='Cube CobraのキューブリストURL（複数指定可）')
     parser.add_argument('--color', required=True,
                        help='取得する色カテゴリ (例: White, Blue, Black, Red, Green, Colorless, Multicolored, Lands, "White,Blue", "all")')
     parser.add_argument('-o', '--output',
                        help='出力ファイル名 (デフォルト: 自動生成)')
     parser.add_argument('--exclude-proxyed', action='store_true',
                        help='Proxyedタグが付いているカードを除外する')
+    parser.add_argument('--dedup', action='store_true',
+                       help='重複する画像URLを除外する（出現順は維持）')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='キューブデータのキャッシュ (~/.cache/cube_helper) を使わない')
+    parser.add_argument('--refresh', action='store_true',
+                       help='キャッシュを無視してキューブデータを再取得する')
 
     args = parser.parse_args()
 
@@ -345,23 +515,58 @@ def main():
             colors_safe = '_'.join([color.lower().replace(' ', '_') for color in target_colors])
             args.output = f"{colors_safe}_images.txt"
 
+    # 複数キューブの場合は出力ファイル名の先頭にキューブIDを付けて衝突を避ける
+    multiple_cubes = len(args.url) > 1
+
     print("=== Cube Cobra API 画像URL抽出 ===")
-    print(f"URL: {args.url}")
+    print(f"URL: {', '.join(args.url)}")
     print(f"色: {', '.join(target_colors)}")
-    print(f"出力ファイル: output/{args.output}")
+    if multiple_cubes:
+        print(f"出力ファイル: output/<キューブID>_{args.output}")
+    else:
+        print(f"出力ファイル: output/{args.output}")
     if args.exclude_proxyed:
         print("🚫 Proxyedタグ除外: 有効")
+    if args.dedup:
+        print("🔁 重複URL除外: 有効")
     print("--------------------------------------------------")
 
     # 抽出処理を実行
-    extractor = CubeCobraAPIExtractor()
-    image_urls = extractor.get_card_images(args.url, target_colors, args.output, args.exclude_proxyed)
+    extractor = CubeCobraAPIExtractor(use_cache=not args.no_cache, refresh_cache=args.refresh)
 
-    if image_urls:
-        print(f"\n🎉 処理完了！{len(image_urls)}個の画像URLを取得しました。")
-    else:
-        print("\n❌ 画像URLの取得に失敗しました。")
+    if not multiple_cubes:
+        image_urls = extractor.get_card_images(args.url[0], target_colors, args.output, args.exclude_proxyed, args.dedup)
+
+        if image_urls:
+            print(f"\n🎉 処理完了！{len(image_urls)}個の画像URLを取得しました。")
+        else:
+            print("\n❌ 画像URLの取得に失敗しました。")
+            sys.exit(1)
+        return
+
+    # API取得だけを並列に行い、抽出・保存はキューブごとに順番に処理する（ログが混ざらないように）
+    cube_data_by_url = extractor.fetch_cube_data_concurrently(args.url)
+    failed_urls = []
+    for cube_url in args.url:
+        print("\n==================================================")
+        print(f"URL: {cube_url}")
+        try:
+            output_file = f"{extractor.extract_cube_id_from_url(cube_url)}_{args.output}"
+        except ValueError:
+            output_file = None
+        image_urls = extractor.get_card_images(cube_url, target_colors, output_file, args.exclude_proxyed, args.dedup,
+                                               cube_data=cube_data_by_url.get(cube_url))
+        if image_urls:
+            print(f"\n🎉 {cube_url}: {len(image_urls)}個の画像URLを取得しました。")
+        else:
+            failed_urls.append(cube_url)
+
+    if failed_urls:
+        print(f"\n❌ {len(failed_urls)}個のキューブで画像URLの取得に失敗しました:")
+        for cube_url in failed_urls:
+            print(f"  {cube_url}")
         sys.exit(1)
+    print(f"\n🎉 処理完了！{len(args.url)}個のキューブを処理しました。")
 
 
 if __name__ == "__main__":
@@ -7,23 +7,55 @@ GitHubリポジトリの仕組みを参考にした独立版
 import os
 import sys
 import json
+import hashlib
+import tempfile
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image, ImageDraw, ImageFont
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
 from io import BytesIO
-import urllib.request
 import time
-import ssl
+import logging
+import argparse
+import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def mm_to_points(mm):
-    """ミリメートルをポイントに変換（1mm = 2.834645669 points）"""
-    return mm * 2.834645669
+logger = logging.getLogger(__name__)
+
+# ミリメートル → ポイント（1mm = 72/25.4 points）。変換は __init__ でのレイアウト計算時のみ
+MM_TO_POINTS = 2.834645669
+
+class ImageDownloadError(Exception):
+    """リトライしても画像を取得できなかった（呼び出し側で処理を打ち切る）"""
+
+class RateLimiter:
+    """直近 period 秒間のリクエスト開始数を max_calls 以下に抑える（スレッド間で共有可）"""
+    
+    def __init__(self, max_calls, period):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """枠が空くまで待ってから1回分を消費する（枠があれば待たない）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            # 待機中はロックを離して他のスレッドを止めない
+            time.sleep(wait)
 
 class ProxyCardPDFGenerator:
-    def __init__(self):
+    def __init__(self, use_cache=True):
         # カードサイズ（要求された88mm x 63mm）
         self.card_width = 63   # mm
         self.card_height = 88  # mm
@@ -44,6 +76,31 @@ class ProxyCardPDFGenerator:
         self.cols = 3
         self.rows = 3
         
+        # 画像処理の解像度（254DPI = 10px/mm、カード1枚 630x880px）
+        # 上げると印刷は精細になるが、リサイズ時間とPDFサイズも増える
+        self.dpi = 254
+        
+        # 完全フィット時、元画像がRGBのJPEGでカードサイズのこの倍率以内なら
+        # デコード・リサイズ・再エンコードせず元のJPEGをそのまま埋め込む（Scryfall large は約1.07倍）
+        self.max_passthrough_scale = 1.25
+        
+        # 再エンコード時のJPEG設定（4:2:0 + Huffman最適化。カード画像ならq=85で見た目の差はほぼない）
+        self.jpeg_quality = 85
+        self.jpeg_subsampling = 2  # 0=4:4:4, 1=4:2:2, 2=4:2:0
+        
+        # 生成済みプレースホルダー画像（失敗時に毎回描画し直さない）
+        self._placeholder_cache = None
+        
+        # プレースホルダーの"No Image"用フォント（フォントファイルの読み込みは1回だけ）
+        try:
+            # システムフォントを試す
+            self._placeholder_font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", size=24)
+        except:
+            try:
+                self._placeholder_font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", size=24)
+            except:
+                self._placeholder_font = ImageFont.load_default()
+        
         # PDFサイズ制限設定
         self.max_pdf_size = None  # デフォルトは制限なし
         self.pages_per_split = 12  # 分割単位（ページ数）
@@ -52,26 +109,26 @@ class ProxyCardPDFGenerator:
         total_cards_width = (self.card_width * self.cols) + (self.card_gap * (self.cols - 1))
         total_cards_height = (self.card_height * self.rows) + (self.card_gap * (self.rows - 1))
         
-        print(f"📏 カードサイズ: {self.card_width}mm x {self.card_height}mm")
-        print(f"📄 A4サイズ: {self.page_width}mm x {self.page_height}mm")
-        print(f"🎯 印刷エリア: {self.printable_width}mm x {self.printable_height}mm")
-        print(f"📐 9枚配置サイズ: {total_cards_width}mm x {total_cards_height}mm")
+        logger.debug("📏 カードサイズ: %smm x %smm", self.card_width, self.card_height)
+        logger.debug("📄 A4サイズ: %smm x %smm", self.page_width, self.page_height)
+        logger.debug("🎯 印刷エリア: %smm x %smm", self.printable_width, self.printable_height)
+        logger.debug("📐 9枚配置サイズ: %smm x %smm", total_cards_width, total_cards_height)
         
         # 配置可能かチェック
         if total_cards_width > self.printable_width:
-            print(f"⚠️  幅が印刷エリアを超過: {total_cards_width}mm > {self.printable_width}mm")
+            logger.warning(f"⚠️  幅が印刷エリアを超過: {total_cards_width}mm > {self.printable_width}mm")
             # 自動調整
             available_width_per_card = (self.printable_width - (self.card_gap * (self.cols - 1))) / self.cols
             if available_width_per_card < self.card_width:
                 self.card_width = available_width_per_card
-                print(f"🔧 カード幅を自動調整: {self.card_width:.1f}mm")
+                logger.warning(f"🔧 カード幅を自動調整: {self.card_width:.1f}mm")
         if total_cards_height > self.printable_height:
-            print(f"⚠️  高さが印刷エリアを超過: {total_cards_height}mm > {self.printable_height}mm")
+            logger.warning(f"⚠️  高さが印刷エリアを超過: {total_cards_height}mm > {self.printable_height}mm")
             # 自動調整
             available_height_per_card = (self.printable_height - (self.card_gap * (self.rows - 1))) / self.rows
             if available_height_per_card < self.card_height:
                 self.card_height = available_height_per_card
-                print(f"🔧 カード高さを自動調整: {self.card_height:.1f}mm")
+                logger.warning(f"🔧 カード高さを自動調整: {self.card_height:.1f}mm")
         
         # 再計算
         total_cards_width = (self.card_width * self.cols) + (self.card_gap * (self.cols - 1))
@@ -81,51 +138,163 @@ class ProxyCardPDFGenerator:
         self.start_x = self.page_margin + (self.printable_width - total_cards_width) / 2
         self.start_y = self.page_margin + (self.printable_height - total_cards_height) / 2
         
-        print(f"📍 開始位置: ({self.start_x:.1f}mm, {self.start_y:.1f}mm)")
+        logger.debug("📍 開始位置: (%.1fmm, %.1fmm)", self.start_x, self.start_y)
+        
+        # 各カードの配置位置（画像の左下角、ポイント単位）。左上から行優先で並べる
+        # レイアウトは全ページ共通なので、ページごとに計算し直さない
+        self._card_positions = [
+            (
+                (self.start_x + col * (self.card_width + self.card_gap)) * MM_TO_POINTS,
+                (self.page_height - (self.start_y + (row + 1) * self.card_height + row * self.card_gap)) * MM_TO_POINTS,
+            )
+            for row in range(self.rows)
+            for col in range(self.cols)
+        ]
+        self._card_w_pt = self.card_width * MM_TO_POINTS
+        self._card_h_pt = self.card_height * MM_TO_POINTS
+        
+        # カット線の線分（ポイント単位）もページ共通なので一度だけ計算する
+        self._cut_line_segments = self._build_cut_line_segments()
+        
+        # 画像ダウンロード用セッション（同じホストへの TCP/TLS 接続を使い回す）
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        })
+        # 並列ダウンロード数より大きいプールにして接続待ちを防ぐ（リトライは download_image 側で行う）
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # 画像サーバーへのリクエストは全スレッド合計で毎秒5回まで（リトライも含む）
+        self._rate_limit = RateLimiter(max_calls=5, period=1.0)
+        
+        # ダウンロード済み画像のキャッシュ（Scryfall の画像URLはバージョン付きで内容が変わらない）
+        self.use_cache = use_cache
+        self.cache_dir = os.path.expanduser("~/.cache/proxy_card_generator")
+        
+    def card_pixel_size(self):
+        """カード1枚分の画像サイズ (幅, 高さ) をピクセルで返す（self.dpi 基準）"""
+        return (
+            round(self.card_width / 25.4 * self.dpi),
+            round(self.card_height / 25.4 * self.dpi),
+        )
+    
+    def can_passthrough_jpeg(self, image):
+        """元のJPEGをそのままPDFに埋め込めるか（RGBのJPEGで、カードサイズに対して大きすぎない）"""
+        target_width, target_height = self.card_pixel_size()
+        return (
+            image.format == 'JPEG'
+            and image.mode == 'RGB'
+            and image.width <= target_width * self.max_passthrough_scale
+            and image.height <= target_height * self.max_passthrough_scale
+        )
+    
+    def _image_cache_path(self, url):
+        """URLに対応するキャッシュファイルのパス"""
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest())
+    
+    def _load_cached_image(self, url):
+        """キャッシュ済みの画像データを返す（無い・無効なら None）"""
+        if not self.use_cache:
+            return None
+        try:
+            with open(self._image_cache_path(url), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def _save_cached_image(self, url, image_data):
+        """画像データをキャッシュに保存（一時ファイル経由で置き換え、別プロセスと並行しても衝突しない）"""
+        if not self.use_cache:
+            return
+        cache_path = self._image_cache_path(url)
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 一時ファイル名は mkstemp で一意に作る（キャッシュは複数プロセスで共有される）
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(image_data)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            # キャッシュ保存に失敗してもダウンロード結果はそのまま使う
+            logger.warning(f"⚠️  キャッシュ保存エラー: {e}")
+    
+    def download_image(self, url, timeout=5, max_retries=2, passthrough_jpeg=False):
+        """画像URLから画像をダウンロード（リトライ機能付き）
+        
+        passthrough_jpeg=True で元のJPEGをそのまま使える場合は、PIL画像ではなく
+        ダウンロードしたバイト列を返す（壊れていないか確かめるため一度デコードはする）
+        """
+        cached_data = self._load_cached_image(url)
         
-    def download_image(self, url, timeout=5, max_retries=2):
-        """画像URLから画像をダウンロード（リトライ機能付き）"""
         for attempt in range(max_retries + 1):
             try:
-                # SSL証明書の問題を回避
-                ssl_context = ssl.create_default_context()
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
-                
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
+                if cached_data is not None:
+                    # キャッシュにあればHTTPリクエストもレート制限も不要
+                    image_data = cached_data
+                else:
+                    self._rate_limit.acquire()
+                    # requests は certifi の証明書バンドルで検証するため、SSL検証を無効化する必要はない
+                    response = self.session.get(url, timeout=timeout)
+                    response.raise_for_status()
+                    image_data = response.content
                 
-                req = urllib.request.Request(url, headers=headers)
-                with urllib.request.urlopen(req, timeout=timeout, context=ssl_context) as response:
-                    image_data = response.read()
-                    
-                # PILで画像を開く
+                # PILで画像を開く（ここではヘッダーしか読まない）
                 image = Image.open(BytesIO(image_data))
+                passthrough = passthrough_jpeg and self.can_passthrough_jpeg(image)
+                
+                if not passthrough:
+                    # JPEGは libjpeg の DCT 縮小デコード（1/2, 1/4, 1/8）でカードサイズの2倍程度まで落として読む
+                    # （リサイズ品質を保つため2倍の余裕を残す。JPEG以外・小さい画像では何もしない）
+                    target_width, target_height = self.card_pixel_size()
+                    image.draft('RGB', (target_width * 2, target_height * 2))
+                
+                # 画素までデコードする（途中で切れた・壊れたデータはここで例外になり、キャッシュも埋め込みもしない）
+                image.load()
+                
+                # 最後まで読めたデータだけをキャッシュする
+                if cached_data is None:
+                    self._save_cached_image(url, image_data)
+                
+                if passthrough:
+                    if attempt > 0:
+                        logger.info(f"    ✅ リトライ {attempt}/{max_retries} で成功")
+                    return image_data
                 
                 # RGBに変換（アルファチャンネルがあれば白背景で合成）
                 if image.mode in ('RGBA', 'LA'):
                     background = Image.new('RGB', image.size, (255, 255, 255))
                     if image.mode == 'LA':
                         image = image.convert('RGBA')
-                    background.paste(image, mask=image.split()[-1])
+                    # RGBA画像自体をマスクに渡すとアルファを直接参照する（split() で全バンドを複製しない）
+                    background.paste(image, mask=image)
                     image = background
                 elif image.mode != 'RGB':
                     image = image.convert('RGB')
                 
                 # 成功した場合
                 if attempt > 0:
-                    print(f"    ✅ リトライ {attempt}/{max_retries} で成功")
+                    logger.info(f"    ✅ リトライ {attempt}/{max_retries} で成功")
                 return image
                 
             except Exception as e:
+                # キャッシュが壊れていた場合は次の試行でダウンロードし直す（ネットワークの失敗ではないので待たない）
+                from_cache = cached_data is not None
+                cached_data = None
                 if attempt < max_retries:
-                    print(f"    ⚠️  試行 {attempt + 1}/{max_retries + 1} 失敗: {e}")
-                    print(f"    🔄 {timeout}秒後にリトライします...")
-                    time.sleep(timeout)  # タイムアウト時間分待機
+                    logger.warning(f"    ⚠️  試行 {attempt + 1}/{max_retries + 1} 失敗: {e}")
+                    if from_cache:
+                        logger.warning("    🔄 キャッシュを使わずにダウンロードし直します...")
+                    else:
+                        logger.warning(f"    🔄 {timeout}秒後にリトライします...")
+                        time.sleep(timeout)  # タイムアウト時間分待機
                 else:
-                    print(f"❌ 画像ダウンロード完全失敗 {url[:50]}...: {e}")
-                    print(f"❌ 最大リトライ回数 ({max_retries}) に達しました")
+                    logger.error(f"❌ 画像ダウンロード完全失敗 {url[:50]}...: {e}")
+                    logger.error(f"❌ 最大リトライ回数 ({max_retries}) に達しました")
                     return None
     
     def resize_image_to_card(self, image, force_exact_size=True):
@@ -133,15 +302,14 @@ class ProxyCardPDFGenerator:
         if not image:
             return None
             
-        # 目標サイズ（高解像度で処理）
-        target_width = int(self.card_width * 10)  # 1mm = 10 pixels at this resolution
-        target_height = int(self.card_height * 10)
+        # 目標サイズ（self.dpi で処理）
+        target_width, target_height = self.card_pixel_size()
         
-        print(f"    🖼️  画像リサイズ: {image.width}x{image.height} → {target_width}x{target_height}px")
+        logger.debug("    🖼️  画像リサイズ: %dx%d → %dx%dpx", image.width, image.height, target_width, target_height)
         
         if force_exact_size:
             # 強制的に正確なサイズにリサイズ（アスペクト比は無視して枠を完全に埋める）
-            print(f"    🔧 強制リサイズモード: アスペクト比を無視してカード枠に完全フィット")
+            logger.debug("    🔧 強制リサイズモード: アスペクト比を無視してカード枠に完全フィット")
             resized = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
         else:
             # アスペクト比計算
@@ -169,50 +337,65 @@ class ProxyCardPDFGenerator:
         
         # 最終確認：正確なサイズになっているかチェック
         if resized.size != (target_width, target_height):
-            print(f"    ⚠️  サイズ不一致を検出、再調整実行")
+            logger.debug("    ⚠️  サイズ不一致を検出、再調整実行")
             # 強制的に正確なサイズにリサイズ（アスペクト比は無視）
             resized = resized.resize((target_width, target_height), Image.Resampling.LANCZOS)
         
-        print(f"    ✅ 最終サイズ: {resized.width}x{resized.height}px")
+        logger.debug("    ✅ 最終サイズ: %dx%dpx", resized.width, resized.height)
         return resized
     
-    def download_images_batch(self, urls, force_exact_size=True):
-        """複数の画像を順次ダウンロード（レート制限対策で0.3秒間隔、失敗時プログラム終了）"""
-        images = []
-        
-        print(f"🔄 {len(urls)} 枚の画像をダウンロード中（0.3秒間隔、タイムアウト5秒、最大2回リトライ）...")
-        
-        for i, url in enumerate(urls):
-            print(f"  🔄 #{i+1}/{len(urls)}: ダウンロード中...")
-            try:
-                # 画像をダウンロード（リトライ機能付き）
-                image = self.download_image(url)
-                
-                if image:
-                    resized_image = self.resize_image_to_card(image, force_exact_size)
-                    images.append(resized_image)
-                    print(f"  ✅ #{i+1}: {url[:50]}...")
-                else:
-                    print(f"  ❌ #{i+1}: ダウンロード完全失敗")
-                    print(f"❌ プログラムを終了します")
-                    sys.exit(1)
-                    
-            except Exception as e:
-                print(f"  ❌ #{i+1}: 処理エラー - {e}")
-                print(f"❌ プログラムを終了します")
-                sys.exit(1)
+    def _fetch_and_resize(self, url, force_exact_size):
+        """1枚の画像をダウンロードしてカードサイズにリサイズ（失敗時は None）
+        
+        完全フィットでは drawImage がカード枠に合わせて拡縮するので、
+        そのまま使えるJPEGは元のバイト列を返す
+        """
+        image = self.download_image(url, passthrough_jpeg=force_exact_size)
+        if image is None:
+            return None
+        if isinstance(image, bytes):
+            logger.debug("    📎 元のJPEGをそのまま使用（リサイズ・再エンコードなし）")
+            return image
+        return self.resize_image_to_card(image, force_exact_size)
+    
+    def download_images_batch(self, urls, force_exact_size=True, max_workers=5):
+        """複数の画像を並列ダウンロード（リクエスト数は self._rate_limit で制限、失敗時 ImageDownloadError）"""
+        images = [None] * len(urls)
+        
+        logger.info(f"🔄 {len(urls)} 枚の画像をダウンロード中（最大{max_workers}並列、毎秒{self._rate_limit.max_calls}リクエストまで、タイムアウト5秒、最大2回リトライ）...")
+        
+        # ネットワーク待ちの間は GIL が解放されるのでスレッドで並列化する
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for i, url in enumerate(urls):
+                logger.debug("  🔄 #%d/%d: ダウンロード開始...", i + 1, len(urls))
+                futures[executor.submit(self._fetch_and_resize, url, force_exact_size)] = i
             
-            # レート制限対策：0.3秒待機（最後のアイテム以外）
-            if i < len(urls) - 1:
-                time.sleep(0.3)
-                print(f"    ⏱️  0.3秒待機...")
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    images[i] = future.result()
+                except Exception as e:
+                    logger.error(f"  ❌ #{i+1}: 処理エラー - {e}")
+                    images[i] = None
+                
+                if images[i] is None:
+                    # 残りのダウンロードは待たずに打ち切る
+                    for pending in futures:
+                        pending.cancel()
+                    raise ImageDownloadError(f"#{i+1}: ダウンロード完全失敗 {urls[i][:50]}...")
+                
+                logger.debug("  ✅ #%d: %.50s...", i + 1, urls[i])
         
         return images
     
     def create_placeholder_image(self):
-        """プレースホルダー画像を作成"""
-        width = int(self.card_width * 10)
-        height = int(self.card_height * 10)
+        """プレースホルダー画像を作成（2回目以降は生成済みの画像を返す）"""
+        width, height = self.card_pixel_size()
+        
+        # 以降の処理では画像を書き換えないので、同じインスタンスを共有してよい
+        if self._placeholder_cache is not None and self._placeholder_cache.size == (width, height):
+            return self._placeholder_cache
         
         image = Image.new('RGB', (width, height), (240, 240, 240))
         draw = ImageDraw.Draw(image)
@@ -221,15 +404,7 @@ class ProxyCardPDFGenerator:
         draw.rectangle([(0, 0), (width-1, height-1)], outline=(200, 200, 200), width=3)
         
         # "No Image"テキスト
-        try:
-            # システムフォントを試す
-            font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", size=24)
-        except:
-            try:
-                font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", size=24)
-            except:
-                font = ImageFont.load_default()
-        
+        font = self._placeholder_font
         text = "No Image"
         
         # テキストサイズ取得
@@ -243,270 +418,239 @@ class ProxyCardPDFGenerator:
         
         draw.text((x, y), text, fill=(150, 150, 150), font=font)
         
+        self._placeholder_cache = image
         return image
     
-    def estimate_page_size(self, page_images, quality=95):
+    def encode_jpeg(self, image):
+        """PIL画像をPDF埋め込み用の設定でJPEGにエンコードし、先頭に戻した BytesIO を返す"""
+        buffer = BytesIO()
+        image.save(
+            buffer,
+            "JPEG",
+            quality=self.jpeg_quality,
+            subsampling=self.jpeg_subsampling,
+            optimize=True,
+        )
+        buffer.seek(0)
+        return buffer
+    
+    def to_jpeg_reader(self, image):
+        """PIL画像をメモリ上でJPEGに変換し、ReportLab用の ImageReader を返す
+        
+        PIL画像をそのまま渡すと無圧縮ピクセル（Flate）で埋め込まれてPDFが肥大化するため、
+        JPEGのバイト列を渡して DCT のまま埋め込ませる。
+        元のJPEGのバイト列（download_image の passthrough_jpeg）はそのまま使う
+        """
+        if isinstance(image, bytes):
+            return ImageReader(BytesIO(image))
+        return ImageReader(self.encode_jpeg(image))
+    
+    def estimate_page_size(self, page_images):
         """1ページの推定サイズを計算（JPEG圧縮後のサイズ合計 + オーバーヘッド）"""
         total_size = 0
         try:
             for img in page_images:
-                if img:
-                    # メモリ上にJPEG保存してサイズ計測
-                    buffer = BytesIO()
-                    img.save(buffer, "JPEG", quality=quality)
-                    total_size += buffer.tell()
+                if isinstance(img, bytes):
+                    # 元のJPEGはそのままのサイズで埋め込まれる
+                    total_size += len(img)
+                elif img:
+                    # 埋め込み時と同じ設定でメモリ上にJPEG保存してサイズ計測
+                    total_size += self.encode_jpeg(img).getbuffer().nbytes
             
             # PDFオーバーヘッド（概算: 100KB + 画像サイズの20%）
             # ReportLabのメタデータ、フォント、構造化データなどを考慮して余裕を持たせる
             overhead = 100 * 1024 + (total_size * 0.20)
             return total_size + overhead
         except Exception as e:
-            print(f"⚠️  サイズ推定エラー: {e}")
+            logger.warning(f"⚠️  サイズ推定エラー: {e}")
             return 2 * 1024 * 1024  # エラー時は2MBと仮定
 
-    def split_batches_by_size(self, all_image_batches):
-        """画像バッチを分割（サイズ制限または固定ページ数）"""
-        
-        if not self.max_pdf_size:
-            # サイズ制限なし：固定ページ数で分割
-            return self._split_by_page_count(all_image_batches)
-        else:
-            # サイズ制限あり：推定サイズで分割
-            return self._split_by_file_size(all_image_batches)
-
-    def _split_by_page_count(self, all_image_batches):
-        """固定ページ数での分割"""
-        total_pages = len(all_image_batches)
-        print(f"\n📊 PDF分割設定 (ページ数固定):")
-        print(f"  総ページ数: {total_pages}")
-        print(f"  分割単位: {self.pages_per_split}ページ")
-        
-        split_batches = []
-        for i in range(0, len(all_image_batches), self.pages_per_split):
-            chunk = all_image_batches[i:i + self.pages_per_split]
-            split_batches.append(chunk)
-            print(f"    📋 分割 {len(split_batches)}: {len(chunk)}ページ")
-        
-        return split_batches
-
-    def _split_by_file_size(self, all_image_batches):
-        """ファイルサイズ制限での分割"""
-        total_pages = len(all_image_batches)
-        limit_bytes = self.max_pdf_size
-        limit_mb = limit_bytes / (1024 * 1024)
-        
-        print(f"\n📊 PDF分割設定 (サイズ制限):")
-        print(f"  総ページ数: {total_pages}")
-        print(f"  サイズ上限: {limit_mb:.1f}MB")
-        
-        split_batches = []
-        current_batch = []
-        current_batch_size = 0
-        
-        print(f"  🔍 各ページのサイズを推定中...")
-        
-        for i, page_images in enumerate(all_image_batches):
-            # ページのサイズ推定
-            page_size = self.estimate_page_size(page_images)
-            page_size_mb = page_size / (1024 * 1024)
-            
-            # 次のページを追加すると制限を超える場合（かつ、現在のバッチが空でない場合）
-            if current_batch and (current_batch_size + page_size > limit_bytes):
-                split_batches.append(current_batch)
-                print(f"    📋 分割 {len(split_batches)}: {len(current_batch)}ページ (推定 {current_batch_size / (1024*1024):.1f}MB)")
-                
-                # 新しいバッチ開始
-                current_batch = [page_images]
-                current_batch_size = page_size
-            else:
-                # バッチに追加
-                current_batch.append(page_images)
-                current_batch_size += page_size
-        
-        # 最後のバッチを追加
-        if current_batch:
-            split_batches.append(current_batch)
-            print(f"    📋 分割 {len(split_batches)}: {len(current_batch)}ページ (推定 {current_batch_size / (1024*1024):.1f}MB)")
-            
-        return split_batches
-    
-    def generate_pdf(self, all_image_batches, output_dir):
-        """全ての画像バッチからPDFを生成（固定ページ数で分割）"""
-        if not all_image_batches:
-            print("❌ 生成する画像がありません")
-            return []
+    def generate_pdf(self, page_batches, output_dir):
+        """ページ単位の画像バッチを順に受け取り、PDFへ逐次書き出す
         
+        page_batches はリストでもジェネレータでもよい。書き終えたページの画像は保持しないため、
+        ダウンロードと組み合わせればメモリ上の画像は総ページ数によらず1ページ分で済む。
+        分割はサイズ制限なしなら pages_per_split ページごと、ありなら推定サイズで行う。
+        """
         os.makedirs(output_dir, exist_ok=True)
         
-        # 固定ページ数で分割
-        split_batches = self.split_batches_by_size(all_image_batches)
+        if self.max_pdf_size:
+            logger.info(f"📊 PDF分割設定 (サイズ制限): 上限 {self.max_pdf_size / (1024 * 1024):.1f}MB")
+        else:
+            logger.info(f"📊 PDF分割設定 (ページ数固定): {self.pages_per_split}ページごと")
         
         generated_pdfs = []
+        c = None
+        part_pages = 0
+        part_size = 0
         
-        for batch_index, batch_pages in enumerate(split_batches, 1):
-            # PDFファイル名を決定
-            if len(split_batches) == 1:
-                pdf_filename = f"proxy_cards.pdf"
-            else:
-                pdf_filename = f"proxy_cards_part{batch_index:02d}.pdf"
-            
-            pdf_path = os.path.join(output_dir, pdf_filename)
+        # 途中でダウンロード失敗・中断した場合は、保存済みのパートも削除する
+        # （一部のページだけのPDFが揃って見える状態で残さない）
+        try:
+            for images in page_batches:
+                page_size = self.estimate_page_size(images) if self.max_pdf_size else 0
             
-            print(f"\n📄 PDF生成中 ({batch_index}/{len(split_batches)}): {pdf_filename}")
-            print(f"  ページ数: {len(batch_pages)}")
+                # 分割境界に達したら現在のPDFを保存して次のファイルへ
+                # （サイズ制限時は、次のページで上限を超える場合。1ページ目は必ず入れる）
+                if c is not None:
+                    if self.max_pdf_size:
+                        reached = part_size + page_size > self.max_pdf_size
+                    else:
+                        reached = part_pages >= self.pages_per_split
+                    if reached:
+                        self._save_pdf(c, generated_pdfs[-1], part_pages, part_size)
+                        c = None
             
-            # 個別PDFを生成
-            self.generate_single_pdf(batch_pages, pdf_path, batch_index, len(split_batches))
-            generated_pdfs.append(pdf_path)
-        
-        return generated_pdfs
-    
-    def generate_single_pdf(self, image_batches, pdf_path, part_num=1, total_parts=1):
-        """単一のPDFファイルを生成"""
-        # ReportLabでPDF作成
-        c = canvas.Canvas(pdf_path, pagesize=A4)
-        
-        for page_num, images in enumerate(image_batches, 1):
-            print(f"  📄 ページ {page_num}/{len(image_batches)} 生成中...")
-            
-            # 画像を配置
-            card_count = 0
-            print(f"    🎴 カード配置開始:")
-            print(f"      📐 配置エリア: {self.cols}列 × {self.rows}行")
+                if c is None:
+                    pdf_path = os.path.join(output_dir, f"proxy_cards_part{len(generated_pdfs) + 1:02d}.pdf")
+                    logger.info(f"📄 PDF生成中: {os.path.basename(pdf_path)}")
+                    c = canvas.Canvas(pdf_path, pagesize=A4)
+                    generated_pdfs.append(pdf_path)
+                    part_pages = 0
+                    part_size = 0
             
-            for row in range(self.rows):
-                for col in range(self.cols):
-                    if card_count < len(images) and images[card_count]:
-                        # カード位置計算（画像の左下角）
-                        x = self.start_x + col * (self.card_width + self.card_gap)
-                        y = self.page_height - (self.start_y + (row + 1) * self.card_height + row * self.card_gap)
-                        
-                        # 画像を一時ファイルとして保存してから配置
-                        temp_image_path = f"/tmp/temp_card_{part_num}_{page_num}_{card_count}.jpg"
-                        images[card_count].save(temp_image_path, "JPEG", quality=95)
-                        
-                        # PDFに画像を配置（完全にカード枠を埋める）
-                        print(f"    🎴 カード #{card_count+1} (行{row+1}, 列{col+1}):")
-                        print(f"      📍 位置: ({x:.1f}mm, {y:.1f}mm)")
-                        print(f"      📐 サイズ: {self.card_width:.1f}mm × {self.card_height:.1f}mm")
-                        
-                        c.drawImage(
-                            temp_image_path,
-                            mm_to_points(x),
-                            mm_to_points(y),
-                            width=mm_to_points(self.card_width),
-                            height=mm_to_points(self.card_height)
-                        )
-                        
-                        # 一時ファイル削除
-                        try:
-                            os.remove(temp_image_path)
-                        except:
-                            pass
-                    
-                    card_count += 1
-                    if card_count >= 9:  # 9枚まで
-                        break
-                if card_count >= 9:
-                    break
+                part_pages += 1
+                part_size += page_size
+                logger.info(f"  📄 ページ {part_pages} 生成中...")
+                self.write_page(c, images)
+                c.showPage()
             
-            # カット線を追加
-            self.add_cut_lines(c)
+            if c is None:
+                logger.error("❌ 生成する画像がありません")
+                return []
             
-            # 最後のページ以外は新しいページを追加
-            if page_num < len(image_batches):
-                c.showPage()
-                print(f"    ✅ ページ {page_num} 完了、次のページへ")
-            else:
-                print(f"    ✅ 最終ページ {page_num} 完了")
+            self._save_pdf(c, generated_pdfs[-1], part_pages, part_size)
+        except BaseException:
+            self._remove_pdfs(generated_pdfs)
+            raise
         
-        # PDFを保存
+        # 1ファイルに収まった場合は分割番号を付けない
+        if len(generated_pdfs) == 1:
+            single_path = os.path.join(output_dir, "proxy_cards.pdf")
+            os.replace(generated_pdfs[0], single_path)
+            generated_pdfs[0] = single_path
+        
+        return generated_pdfs
+    
+    def _remove_pdfs(self, pdf_paths):
+        """書き出し済みのPDFを削除（保存前のキャンバスはファイルが無いので飛ばす）"""
+        for pdf_path in pdf_paths:
+            try:
+                os.remove(pdf_path)
+                logger.warning(f"🗑️  途中までのPDFを削除: {os.path.basename(pdf_path)}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️  PDF削除エラー: {e}")
+    
+    def _save_pdf(self, c, pdf_path, page_count, estimated_size=0):
+        """キャンバスを保存してファイルサイズを表示"""
         c.save()
         
         file_size = os.path.getsize(pdf_path)
         actual_size_mb = file_size / 1024 / 1024
         
-        print(f"  ✅ PDF保存完了: {os.path.basename(pdf_path)}")
-        print(f"    📊 ファイルサイズ: {actual_size_mb:.1f}MB ({file_size:,} bytes)")
-        
-        return pdf_path
+        logger.info(f"  ✅ PDF保存完了: {os.path.basename(pdf_path)} ({page_count}ページ)")
+        if estimated_size:
+            logger.info(f"    📊 ファイルサイズ: {actual_size_mb:.1f}MB ({file_size:,} bytes、推定 {estimated_size / (1024 * 1024):.1f}MB)")
+        else:
+            logger.info(f"    📊 ファイルサイズ: {actual_size_mb:.1f}MB ({file_size:,} bytes)")
     
-    def add_cut_lines(self, canvas_obj):
-        """カット線を追加（9枚の画像の外に延長する形で表示）"""
-        canvas_obj.setStrokeColorRGB(0, 0, 0)  # 適度なグレー（見やすい）
-        canvas_obj.setLineWidth(0.05)  # 適度な太さ
-        canvas_obj.setDash([1, 2])  # 破線スタイル（切り取り線らしく）
-        
-        print(f"  📐 カット線生成中（外側延長モード）...")
-        print(f"    📏 カード配置: {self.cols}列 × {self.rows}行")
-        print(f"    📍 開始位置: ({self.start_x:.1f}mm, {self.start_y:.1f}mm)")
-        print(f"    📐 カードサイズ: {self.card_width:.1f}mm × {self.card_height:.1f}mm")
-        print(f"    📏 カード間隔: {self.card_gap:.1f}mm")
+    def write_page(self, c, images):
+        """1ページ分（最大9枚）のカードとカット線をキャンバスに描画"""
+        # 画像を配置
+        logger.debug("    🎴 カード配置開始: %d列 × %d行", self.cols, self.rows)
+        
+        # 位置は __init__ で計算済み（1ページに収まらない分は無視）
+        for card_count, (image, (x_pt, y_pt)) in enumerate(zip(images, self._card_positions)):
+            if not image:
+                continue
+            
+            # 画像はメモリ上でJPEGにして配置（一時ファイルを経由しない）
+            card_image = self.to_jpeg_reader(image)
+            
+            # PDFに画像を配置（完全にカード枠を埋める）
+            row, col = divmod(card_count, self.cols)
+            logger.debug("    🎴 カード #%d (行%d, 列%d)", card_count + 1, row + 1, col + 1)
+            
+            c.drawImage(card_image, x_pt, y_pt, width=self._card_w_pt, height=self._card_h_pt)
         
+        # カット線を追加
+        self.add_cut_lines(c)
+    
+    def _build_cut_line_segments(self, extension_length=8.0):
+        """カット線の線分 ((x1, y1), (x2, y2)) をPDFのポイント座標で返す（9枚の画像の外に延長）"""
         # カード配置エリア全体の座標を計算
         cards_left = self.start_x
         cards_right = self.start_x + (self.card_width * self.cols) + (self.card_gap * (self.cols - 1))
         cards_top = self.start_y
         cards_bottom = self.start_y + (self.card_height * self.rows) + (self.card_gap * (self.rows - 1))
         
-        # 延長する長さ（5mm延長）
-        extension_length = 8.0  # mm
+        segments = []
         
-        # 縦線（各カードの左右の境界を外に延長）
+        # 縦線（各カードの左右の境界を上下に extension_length mm 延長、用紙内に収める）
+        y1_extended = max(0, cards_top - extension_length)
+        y2_extended = min(self.page_height, cards_bottom + extension_length)
         for col in range(self.cols + 1):
-            if col == 0:
-                # 左端の線
-                x = cards_left
-            elif col == self.cols:
+            if col == self.cols:
                 # 右端の線
                 x = cards_right
             else:
-                # 中間の線（カード間の境界）
+                # 左端・中間の線（カード間の境界）
                 x = self.start_x + col * (self.card_width + self.card_gap)
-            
-            # 上方向に延長
-            y1_extended = max(0, cards_top - extension_length)
-            # 下方向に延長
-            y2_extended = min(self.page_height, cards_bottom + extension_length)
-            
-            print(f"    ┃ 縦線 #{col+1}: x={x:.1f}mm, y={y1_extended:.1f}mm-{y2_extended:.1f}mm (延長)")
-            
-            canvas_obj.line(
-                mm_to_points(x),
-                mm_to_points(self.page_height - y1_extended),
-                mm_to_points(x),
-                mm_to_points(self.page_height - y2_extended)
-            )
-        
-        # 横線（各カードの上下の境界を外に延長）
+            segments.append((
+                (x * MM_TO_POINTS, (self.page_height - y1_extended) * MM_TO_POINTS),
+                (x * MM_TO_POINTS, (self.page_height - y2_extended) * MM_TO_POINTS),
+            ))
+        
+        # 横線（各カードの上下の境界を左右に延長）
+        x1_extended = max(0, cards_left - extension_length)
+        x2_extended = min(self.page_width, cards_right + extension_length)
         for row in range(self.rows + 1):
-            if row == 0:
-                # 上端の線
-                y = cards_top
-            elif row == self.rows:
+            if row == self.rows:
                 # 下端の線
                 y = cards_bottom
             else:
-                # 中間の線（カード間の境界）
+                # 上端・中間の線（カード間の境界）
                 y = self.start_y + row * (self.card_height + self.card_gap)
-            
-            # 左方向に延長
-            x1_extended = max(0, cards_left - extension_length)
-            # 右方向に延長
-            x2_extended = min(self.page_width, cards_right + extension_length)
-            
-            print(f"    ━ 横線 #{row+1}: y={y:.1f}mm, x={x1_extended:.1f}mm-{x2_extended:.1f}mm (延長)")
-            
-            canvas_obj.line(
-                mm_to_points(x1_extended),
-                mm_to_points(self.page_height - y),
-                mm_to_points(x2_extended),
-                mm_to_points(self.page_height - y)
-            )
+            segments.append((
+                (x1_extended * MM_TO_POINTS, (self.page_height - y) * MM_TO_POINTS),
+                (x2_extended * MM_TO_POINTS, (self.page_height - y) * MM_TO_POINTS),
+            ))
         
-        print(f"  ✅ カット線生成完了（外側延長: {extension_length}mm）")
+        return segments
+    
+    def add_cut_lines(self, canvas_obj):
+        """カット線を追加（線分は __init__ で計算済み）"""
+        canvas_obj.setStrokeColorRGB(0, 0, 0)  # 適度なグレー（見やすい）
+        canvas_obj.setLineWidth(0.05)  # 適度な太さ
+        canvas_obj.setDash([1, 2])  # 破線スタイル（切り取り線らしく）
+        
+        for (x1, y1), (x2, y2) in self._cut_line_segments:
+            canvas_obj.line(x1, y1, x2, y2)
 
 def main():
+    parser = argparse.ArgumentParser(description="画像URLからプロキシカードPDFを生成する（設定は対話形式で入力）")
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="カード1枚ごとのダウンロード・リサイズ・配置の詳細ログを表示する",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="画像キャッシュ (~/.cache/proxy_card_generator) を使わずに毎回ダウンロードする",
+    )
+    args = parser.parse_args()
+    
+    # 進捗は標準出力へ（input() のプロンプトと順序が入れ替わらないように）
+    # 通常はページ単位の進捗まで、--verbose でカード単位の詳細も出す
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(message)s",
+        stream=sys.stdout,
+    )
+    
     print("🎴 プロキシカード PDF 生成ツール")
     print("=" * 50)
     
@@ -597,35 +741,38 @@ def main():
     print(f"\n📁 PDF出力先: {output_dir}")
     
     # PDF生成器を作成
-    generator = ProxyCardPDFGenerator()
+    generator = ProxyCardPDFGenerator(use_cache=not args.no_cache)
     generator.max_pdf_size = max_pdf_size
     
     # URLを9個ずつのバッチに分割
     batches = [urls[i:i+9] for i in range(0, len(urls), 9)]
     print(f"\n📦 {len(batches)} ページのPDFを作成予定")
     
-    # 全ての画像バッチを格納するリスト
-    all_image_batches = []
-    
-    # 各バッチを処理して画像を取得
-    for batch_num, batch_urls in enumerate(batches, 1):
-        print(f"\n🔄 バッチ {batch_num}/{len(batches)} 処理中... ({len(batch_urls)} 枚)")
-        
-        # 画像をダウンロードしてリサイズ
-        images = generator.download_images_batch(batch_urls, force_exact_size)
-        
-        # 失敗した画像をプレースホルダーで置換
-        for i in range(len(images)):
-            if images[i] is None:
-                print(f"  🔄 #{i+1} プレースホルダー画像を生成中...")
-                images[i] = generator.create_placeholder_image()
-        
-        all_image_batches.append(images)
-        print(f"✅ バッチ {batch_num} 完了")
+    def iter_pages():
+        """バッチごとに画像をダウンロードし、1ページ分ずつ渡す（全ページ分は溜めない）"""
+        for batch_num, batch_urls in enumerate(batches, 1):
+            print(f"\n🔄 バッチ {batch_num}/{len(batches)} 処理中... ({len(batch_urls)} 枚)")
+            
+            # 画像をダウンロードしてリサイズ
+            images = generator.download_images_batch(batch_urls, force_exact_size)
+            
+            # 失敗した画像をプレースホルダーで置換
+            for i in range(len(images)):
+                if images[i] is None:
+                    print(f"  🔄 #{i+1} プレースホルダー画像を生成中...")
+                    images[i] = generator.create_placeholder_image()
+            
+            print(f"✅ バッチ {batch_num} ダウンロード完了")
+            yield images
     
-    # 単一のPDFを生成（全バッチを含む）
+    # ダウンロードとPDF書き出しを1ページずつ交互に行う
     print(f"\n📄 PDF生成開始...")
-    generated_files = generator.generate_pdf(all_image_batches, output_dir)
+    try:
+        generated_files = generator.generate_pdf(iter_pages(), output_dir)
+    except ImageDownloadError as e:
+        logger.error("  ❌ %s", e)
+        logger.error("❌ プログラムを終了します")
+        sys.exit(1)
     
     print(f"\n🎉 全処理完了!")
     print(f"📄 生成されたPDFファイル: {len(generated_files)} 個")
@@ -639,7 +786,7 @@ def main():
     
     print(f"\n📊 総計:")
     print(f"  📄 PDFファイル数: {len(generated_files)}")
-    print(f"  📄 総ページ数: {len(all_image_batches)}")
+    print(f"  📄 総ページ数: {len(batches)}")
     print(f"  📊 総サイズ: {total_size / 1024 / 1024:.1f}MB ({total_size:,} bytes)")
     
     print(f"\n📁 出力ディレクトリ: {output_dir}")
@@ -7,19 +7,64 @@ Usage:
 
 import argparse
 import csv
+import functools
+import io
+import json
+import math
+import operator
+import os
+import re
 import sys
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional
 
-import cloudscraper
 import requests
-
-# Moxfield は Cloudflare Bot Protection が有効なため cloudscraper を使用
-_mox_scraper = cloudscraper.create_scraper()
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# orjson があれば高速な方を使う（バイト列を直接受け取れる。無ければ標準の json）
+# orjson.JSONDecodeError は json.JSONDecodeError のサブクラスなので例外処理は共通
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Moxfield は Cloudflare Bot Protection が有効なため cloudscraper を使用（初回アクセス時に生成）
+_mox_scraper: Optional[requests.Session] = None
+
+
+# Scryfall は 1 デッキで 2N 回以上叩くため、接続を使い回して TLS ハンドシェイクを省く
+# （連絡先付きの User-Agent と Accept の指定は Scryfall API の利用条件。TLS 1.2 以上は urllib3 2.x の既定）
+# 429（レート超過）・5xx は Retry-After を守りつつ指数バックオフで再試行する
+# （/cards/collection の POST も参照のみなので再試行してよい）
+# 再試行し尽くした場合は最後のレスポンスを返し、raise_for_status() で従来どおり HTTPError にする
+_scry_session = requests.Session()
+_scry_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+))
+_scry_session.headers.update({
+    "User-Agent": "moxfield-fetcher/1.0 (+https://github.com/t-ike/tools)",
+    "Accept": "application/json;q=0.9,*/*;q=0.8",
+})
 
 # ── 定数 ────────────────────────────────────────────────────────────────
 MOXFIELD_DECK_API = "https://api2.moxfield.com/v3/decks/all/{deck_code}"
 SCRYFALL_NAMED_API = "https://api.scryfall.com/cards/named"
+SCRYFALL_COLLECTION_API = "https://api.scryfall.com/cards/collection"
+COLLECTION_BATCH_SIZE = 75   # /cards/collection の 1 リクエストあたりの上限
 OUTPUT_FILE = "mtg_cards.csv"
 CSV_COLUMNS = [
     "card_name_ja",
@@ -31,10 +76,21 @@ CSV_COLUMNS = [
     "scryfall_uri",
     "all_set_codes",
 ]
-REQUEST_DELAY = 0.1   # Scryfall 推奨: 50-100ms
+# Scryfall のレート制限（リクエスト開始間隔。全スレッド合計で適用）
+# /cards/search（全再録のページング）・/cards/named・/cards/collection は 2 回/秒まで
+CARD_LOOKUP_INTERVAL_MS = 500
+MAX_WORKERS = 8       # 並列に処理するカード数
+PAGE_WORKERS = 4      # 全再録の 2 ページ目以降を並列に取得する数（全カード合計）
+
+# 全再録のうち、このスクリプトが参照するフィールド（それ以外はページ取得直後に捨てる）
+_PRINT_KEYS = (
+    "name", "printed_name", "oracle_id", "set", "lang", "released_at",
+    "scryfall_uri", "cmc", "type_line", "image_uris", "card_faces",
+)
+_FACE_KEYS = ("name", "printed_name", "type_line", "image_uris")
 
 # カードタイプのソート優先度（小さいほど先）
-# 複数タイプを持つカード（例: Artifact Creature）は先にヒットした方が優先される
+# 複数タイプを持つカード（例: Artifact Creature）は優先度の高い方が採用される
 _TYPE_PRIORITY: dict[str, int] = {
     "planeswalker": 0,
     "creature":     1,
@@ -45,19 +101,45 @@ _TYPE_PRIORITY: dict[str, int] = {
     "land":         7,
 }
 _OTHER_TYPE_PRIORITY = 6  # 未知のタイプは land の直前
+_TYPE_RE = re.compile("|".join(_TYPE_PRIORITY), re.IGNORECASE)
 
 
 def get_type_priority(type_line: str) -> int:
     """type_line 文字列からソート優先度を返す。"""
-    tl = type_line.lower()
-    for name, prio in _TYPE_PRIORITY.items():
-        if name in tl:
-            return prio
-    return _OTHER_TYPE_PRIORITY
+    # 左端の一致ではなく、含まれるタイプのうち最も優先度の高いものを採用する
+    # （"Artifact Creature" は creature 扱い）
+    return min(
+        (_TYPE_PRIORITY[name.lower()] for name in _TYPE_RE.findall(type_line)),
+        default=_OTHER_TYPE_PRIORITY,
+    )
 
 
 # ── Moxfield ────────────────────────────────────────────────────────────
 
+def _mox() -> requests.Session:
+    """
+    Moxfield 用のセッションを返す（初回呼び出し時に生成）。
+    環境変数 CF_CLEARANCE があれば、その cookie を付けた素の requests.Session を使う
+    （cookie はそれを取得したブラウザの User-Agent でないと通らないため CF_USER_AGENT も渡す）。
+    無ければ cloudscraper で Cloudflare のチャレンジを解く。
+    """
+    global _mox_scraper
+    if _mox_scraper is None:
+        cf_clearance = os.environ.get("CF_CLEARANCE")
+        if cf_clearance:
+            session = requests.Session()
+            session.cookies.set("cf_clearance", cf_clearance)
+            user_agent = os.environ.get("CF_USER_AGENT")
+            if user_agent:
+                session.headers["User-Agent"] = user_agent
+            _mox_scraper = session
+        else:
+            # import 自体も重いので、必要になるまで読み込まない
+            import cloudscraper
+            _mox_scraper = cloudscraper.create_scraper()
+    return _mox_scraper
+
+
 def fetch_deck_cards(deck_code: str) -> dict[str, str]:
     """
     Moxfield の公開デッキから mainboard のカード情報を取得する。
@@ -67,15 +149,14 @@ def fetch_deck_cards(deck_code: str) -> dict[str, str]:
     """
     url = MOXFIELD_DECK_API.format(deck_code=deck_code)
     print(f"[Moxfield] デッキ取得: {url}")
-    resp = _mox_scraper.get(url, timeout=30)
+    resp = _mox().get(url, timeout=30)
     resp.raise_for_status()
-    data = resp.json()
+    data = _json_loads(resp.content)
 
-    # v3 API: boards.mainboard.cards.{key}.card
+    # v3 API: boards.mainboard.cards.{key}.card（途中が null の場合もある）
     card_sets: dict[str, str] = {}
-    boards = data.get("boards") or {}
-    board = boards.get("mainboard") or {}
-    for entry in (board.get("cards") or {}).values():
+    cards = ((data.get("boards") or {}).get("mainboard") or {}).get("cards") or {}
+    for entry in cards.values():
         card_obj = entry.get("card") or {}
         name = card_obj.get("name", "").strip()
         set_code = card_obj.get("set", "").strip()
@@ -88,11 +169,38 @@ def fetch_deck_cards(deck_code: str) -> dict[str, str]:
 
 # ── Scryfall ─────────────────────────────────────────────────────────────
 
+class RateLimiter:
+    """
+    リクエスト開始を interval_ms 以上空ける（スレッド間で共有可）。
+    前回から interval_ms 以上経っていれば待たない。
+    """
+
+    def __init__(self, interval_ms: float) -> None:
+        self.interval = interval_ms / 1000
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        # 待つのはロックの外（次のスレッドは自分の開始時刻を予約してから待つ）
+        if delay > 0:
+            time.sleep(delay)
+
+
+# 3 つのエンドポイントで 1 つの枠を共有する（全再録の並列取得もこの間隔で頭打ちになる）
+_card_lookup_rl = RateLimiter(CARD_LOOKUP_INTERVAL_MS)
+
+
 def fetch_base_card(card_name: str) -> Optional[dict]:
     """
     /cards/named?exact={card_name} でベースカード情報を取得する。
+    （fetch_base_cards_batch で対応付けできなかったカード用）
     """
-    resp = requests.get(
+    _card_lookup_rl.wait()
+    resp = _scry_session.get(
         SCRYFALL_NAMED_API,
         params={"exact": card_name},
         timeout=30,
@@ -101,13 +209,118 @@ def fetch_base_card(card_name: str) -> Optional[dict]:
         print(f"  [WARN] '{card_name}' が Scryfall で見つかりません")
         return None
     resp.raise_for_status()
-    return resp.json()
+    return _json_loads(resp.content)
+
+
+def _fetch_base_card_or_none(card_name: str) -> Optional[dict]:
+    """fetch_base_card の失敗はそのカードだけのエラーとして扱う（デッキ全体は止めない）"""
+    try:
+        return fetch_base_card(card_name)
+    except (requests.RequestException, ValueError) as e:
+        print(f"  [ERROR] ベースカード取得エラー ({card_name}): {e}")
+        return None
+
+
+def fetch_base_cards_batch(names: list[str]) -> dict[str, dict]:
+    """
+    /cards/collection でベースカード情報をまとめて取得する（75 件ずつ POST）。
+    POST が失敗したまとまりは /cards/named で 1 枚ずつ取り直す。
+
+    Returns:
+        {card_name: base_card} の dict（見つからなかった・取得できなかったカードは含まない）
+    """
+    base_cards: dict[str, dict] = {}
+    for start in range(0, len(names), COLLECTION_BATCH_SIZE):
+        chunk = names[start:start + COLLECTION_BATCH_SIZE]
+        _card_lookup_rl.wait()
+        try:
+            resp = _scry_session.post(
+                SCRYFALL_COLLECTION_API,
+                json={"identifiers": [{"name": name} for name in chunk]},
+                timeout=30,
+            )
+            resp.raise_for_status()
+            data = _json_loads(resp.content)
+        except (requests.RequestException, ValueError) as e:
+            print(f"  [WARN] /cards/collection の取得に失敗したため 1 枚ずつ取得します: {e}")
+            for name in chunk:
+                base_card = _fetch_base_card_or_none(name)
+                if base_card is not None:
+                    base_cards[name] = base_card
+            continue
+
+        # data は not_found を除いて返るため、カード名（両面カードは各面の名前も）で対応付ける
+        by_name: dict[str, dict] = {}
+        for card in data.get("data", []):
+            by_name.setdefault(card.get("name", "").lower(), card)
+            for face in card.get("card_faces", []):
+                by_name.setdefault(face.get("name", "").lower(), card)
+        not_found = {ident.get("name", "").lower() for ident in data.get("not_found", [])}
+
+        for name in chunk:
+            key = name.lower()
+            if key in by_name:
+                base_cards[name] = by_name[key]
+            elif key in not_found:
+                print(f"  [WARN] '{name}' が Scryfall で見つかりません")
+            else:
+                # 表記揺れなどで対応付けできなかった分だけ /cards/named で取り直す
+                base_card = _fetch_base_card_or_none(name)
+                if base_card is not None:
+                    base_cards[name] = base_card
+
+    print(f"[Scryfall] ベースカード {len(base_cards)}/{len(names)} 枚を取得")
+    return base_cards
+
+
+def _compact_print(card: dict) -> dict:
+    """
+    print オブジェクトを参照するフィールドだけに絞る（image_uris は png のみ）。
+    "image_uris" の有無で単面/両面を判定するため、元に無いキーは追加しない。
+    """
+    def project(obj: dict, keys: tuple[str, ...]) -> dict:
+        out = {k: obj[k] for k in keys if k in obj}
+        if "image_uris" in out:
+            out["image_uris"] = {"png": out["image_uris"].get("png", "")}
+        return out
+
+    compact = project(card, _PRINT_KEYS)
+    if "card_faces" in compact:
+        compact["card_faces"] = [project(face, _FACE_KEYS) for face in compact["card_faces"]]
+    return compact
+
+
+def _fetch_prints_page(url: str) -> tuple[list[dict], Optional[str], Optional[int]]:
+    """
+    検索結果を 1 ページ取得する。
+
+    Returns:
+        (必要なフィールドに絞った print のリスト, next_page, total_cards)
+    """
+    # prints_search_uri は /cards/search なので、/cards/named と同じ制限が掛かる
+    _card_lookup_rl.wait()
+    resp = _scry_session.get(url, timeout=30)
+    resp.raise_for_status()
+    page_data = _json_loads(resp.content)
+    # 1 枚あたり数 KB の print を必要なフィールドだけにして保持する
+    page_prints = [_compact_print(p) for p in page_data.get("data", [])]
+    return page_prints, page_data.get("next_page"), page_data.get("total_cards")
+
 
+# ページ取得用のスレッドは全カードで共有する（カードごとに作ると同時接続が
+# MAX_WORKERS * PAGE_WORKERS まで増え、_scry_session の pool_maxsize を超えてしまう）
+# 同時接続はカード用とページ用の合計 MAX_WORKERS + PAGE_WORKERS に収まる
+_page_executor = ThreadPoolExecutor(max_workers=PAGE_WORKERS)
 
-def fetch_all_prints(prints_search_uri: str) -> list[dict]:
+
+@functools.lru_cache(maxsize=1024)
+def fetch_all_prints(prints_search_uri: str) -> tuple[dict, ...]:
     """
     prints_search_uri を使って全再録を取得する（ページング対応）。
     include_multilingual=1 を付けて日本語版も含める。
+    2 ページ目以降は総件数から URL を組み立てて並列に取得する
+    （all_set_codes に全セットを出すため、途中で打ち切らない）。
+    同じ引数は実行中に 1 度だけ取得する（キャッシュを共有するため tuple で返す。中身は変更しないこと）。
     """
     # デフォルトは英語のみ返るため、多言語版を含めるパラメータを追加
     sep = "&" if "?" in prints_search_uri else "?"
@@ -117,15 +330,18 @@ def fetch_all_prints(prints_search_uri: str) -> list[dict]:
     url: Optional[str] = base_url
 
     while url:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        page_data = resp.json()
-        all_prints.extend(page_data.get("data", []))
-        url = page_data.get("next_page")
-        if url:
-            time.sleep(REQUEST_DELAY)
+        page_prints, url, total_cards = _fetch_prints_page(url)
+        all_prints.extend(page_prints)
+        if url and total_cards and page_prints:
+            # 1 ページ目で総件数が分かれば、残りは &page=N で並列に取得する
+            # （map は要求順に返すので、print の並びは順にたどった場合と同じ）
+            page_count = math.ceil(total_cards / len(page_prints))
+            page_urls = [f"{base_url}&page={n}" for n in range(2, page_count + 1)]
+            for page_prints, _, _ in _page_executor.map(_fetch_prints_page, page_urls):
+                all_prints.extend(page_prints)
+            break
 
-    return all_prints
+    return tuple(all_prints)
 
 
 def get_image_url_for_face(card: dict, face_index: int = 0) -> str:
@@ -158,45 +374,41 @@ def pick_best_print(
       3. 言語数が同数の場合は released_at が最新のセットを選ぶ
       4. 日本語なし → 英語版の中で released_at 最新を返す
     """
-    from collections import defaultdict
-
-    # 0. Moxfield 選択セットの日本語版を最優先
-    if mox_set_code:
-        mox_ja = next(
-            (p for p in prints if p.get("set") == mox_set_code and p.get("lang") == "ja"),
-            None,
-        )
-        if mox_ja:
-            return mox_ja
-
-    # set_code ごとにグループ化
-    set_prints: dict[str, list[dict]] = defaultdict(list)
+    # prints を 1 回だけ走査して、判定に必要な情報をまとめて集める
+    #   set_langs: set_code → 言語の集合（挿入順 = セットの初出順）
+    #   set_ja:    set_code → そのセットで最初に現れる日本語版
+    #   en_best:   released_at が最新の英語版（同日なら先に現れた方）
+    set_langs: dict[str, set] = defaultdict(set)
+    set_ja: dict[str, dict] = {}
+    en_best: Optional[dict] = None
     for p in prints:
+        lang = p.get("lang")
         code = p.get("set", "")
         if code:
-            set_prints[code].append(p)
-
-    # 日本語版を含むセットだけ残す
-    ja_sets = {
-        code: ps
-        for code, ps in set_prints.items()
-        if any(p.get("lang") == "ja" for p in ps)
-    }
-
-    if ja_sets:
-        def set_score(item: tuple[str, list[dict]]) -> tuple[int, str]:
-            _, ps = item
-            lang_count = len({p.get("lang") for p in ps})
-            ja_card = next(p for p in ps if p.get("lang") == "ja")
-            return (lang_count, ja_card.get("released_at", ""))
+            set_langs[code].add(lang)
+            if lang == "ja" and code not in set_ja:
+                set_ja[code] = p
+        if lang == "en" and (
+            en_best is None or p.get("released_at", "") > en_best.get("released_at", "")
+        ):
+            en_best = p
 
-        _, best_ps = max(ja_sets.items(), key=set_score)
-        return next(p for p in best_ps if p.get("lang") == "ja")
+    # 0. Moxfield 選択セットの日本語版を最優先
+    if mox_set_code and mox_set_code in set_ja:
+        return set_ja[mox_set_code]
+
+    # 1-3. 日本語版を含むセットのうち、言語数 → 日本語版の released_at が最大のもの
+    #      （同点はセットの初出順で先のもの）
+    if set_ja:
+        best_code = max(
+            (code for code in set_langs if code in set_ja),
+            key=lambda code: (len(set_langs[code]), set_ja[code].get("released_at", "")),
+        )
+        return set_ja[best_code]
 
-    # 日本語なし → 英語版の最新
-    en_prints = [p for p in prints if p.get("lang") == "en"]
-    if en_prints:
-        return max(en_prints, key=lambda p: p.get("released_at", ""))
+    # 4. 日本語なし → 英語版の最新
+    if en_best is not None:
+        return en_best
 
     return prints[0]
 
@@ -232,7 +444,7 @@ def build_card_rows(
     """
     best = pick_best_print(prints, mox_set_code=mox_set_code)
     is_japanese = best.get("lang") == "ja"
-    all_set_codes = "|".join(sorted({p.get("set", "") for p in prints} - {""}))
+    all_set_codes = "|".join(sorted({code for p in prints if (code := p.get("set"))}))
 
     faces = best.get("card_faces", [])
     is_double_faced = len(faces) >= 2 and "image_uris" not in best
@@ -275,16 +487,60 @@ def build_card_rows(
 
 # ── CSV 出力 ─────────────────────────────────────────────────────────────
 
+_csv_row = operator.itemgetter(*CSV_COLUMNS)
+
+
 def write_csv(rows: list[dict], output_path: str) -> None:
+    # DictWriter は行ごとに Python で dict → list 変換するため、itemgetter で並べて
+    # C 実装の csv.writer に渡す。メモリ上で組み立てて 1 回の write で書き出す
+    buf = io.StringIO(newline="")
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    writer.writerows(map(_csv_row, rows))
     with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
-        writer.writeheader()
-        writer.writerows(rows)
+        f.write(buf.getvalue())
     print(f"\n[完了] {output_path} に {len(rows)} 件を出力しました")
 
 
 # ── メイン ───────────────────────────────────────────────────────────────
 
+def _prints_key(base_card: dict) -> str:
+    """全再録の取得単位。oracle_id が同じカードは同じ全再録を返すのでまとめる"""
+    # reversible_card などトップレベルに oracle_id が無いものは URI で区別する
+    return base_card.get("oracle_id") or base_card["prints_search_uri"]
+
+
+def process_card(
+    name: str,
+    base_card: Optional[dict],
+    mox_set: Optional[str],
+    prints_futures: dict[str, Future],
+) -> list[dict]:
+    """
+    1 枚分の全再録の取得結果を待ち、CSV 行を組み立てる。
+    取得できなかった場合は空リストを返す。
+    """
+    try:
+        if base_card is None:
+            # 見つからなかった・取得に失敗した理由はベースカード取得時に表示済み
+            print(f"  [WARN] ベースカード情報が無いためスキップします: {name}")
+            return []
+
+        prints_search_uri = base_card.get("prints_search_uri", "")
+        if not prints_search_uri:
+            print(f"  [WARN] prints_search_uri が取得できません: {name}")
+            return []
+
+        all_prints = list(prints_futures[_prints_key(base_card)].result())
+        return build_card_rows(base_card, all_prints, mox_set_code=mox_set)
+
+    except requests.HTTPError as e:
+        print(f"  [ERROR] HTTP エラー ({name}): {e}")
+    except Exception as e:  # noqa: BLE001
+        print(f"  [ERROR] 予期しないエラー ({name}): {e}")
+    return []
+
+
 def main(
     deck_code: str,
     output_file: str = OUTPUT_FILE,
@@ -293,28 +549,30 @@ def main(
     deck_cards = fetch_deck_cards(deck_code)
     rows: list[dict] = []
     names = sorted(deck_cards.keys())
+    mox_sets = [deck_cards[name] if use_moxfield_print else None for name in names]
 
     if use_moxfield_print:
         print("[INFO] Moxfield 選択セットの日本語版を最優先します")
 
-    for i, name in enumerate(names, start=1):
-        mox_set = deck_cards[name] if use_moxfield_print else None
-        print(f"[{i}/{len(names)}] 処理中: {name}" + (f" (mox_set={mox_set})" if mox_set else ""))
-        try:
-            base_card = fetch_base_card(name)
-            if base_card is None:
-                continue
-            time.sleep(REQUEST_DELAY)
+    # ベースカードは名前をまとめて取得する（1 枚ずつの /cards/named より大幅にリクエストが少ない）
+    base_cards = fetch_base_cards_batch(names)
 
-            prints_search_uri = base_card.get("prints_search_uri", "")
-            if not prints_search_uri:
-                print(f"  [WARN] prints_search_uri が取得できません: {name}")
+    # 全再録の取得はカード間に依存がないので並列に行う（レート制限は RateLimiter で全体に掛かる）
+    # oracle_id が同じカードは 1 回だけ取得して結果を共有する
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        prints_futures: dict[str, Future] = {}
+        for name in names:
+            base_card = base_cards.get(name)
+            if not base_card or not base_card.get("prints_search_uri"):
                 continue
-
-            all_prints = fetch_all_prints(prints_search_uri)
-            time.sleep(REQUEST_DELAY)
-
-            card_rows = build_card_rows(base_card, all_prints, mox_set_code=mox_set)
+            key = _prints_key(base_card)
+            if key not in prints_futures:
+                prints_futures[key] = executor.submit(fetch_all_prints, base_card["prints_search_uri"])
+
+        # 入力順に結果を待つため、進捗表示と行の順序は逐次処理と同じになる
+        for i, (name, mox_set) in enumerate(zip(names, mox_sets), start=1):
+            print(f"[{i}/{len(names)}] {name}" + (f" (mox_set={mox_set})" if mox_set else ""))
+            card_rows = process_card(name, base_cards.get(name), mox_set, prints_futures)
             rows.extend(card_rows)
             for row in card_rows:
                 print(
@@ -322,11 +580,6 @@ def main(
                     f"/ ja={row['is_japanese']}"
                 )
 
-        except requests.HTTPError as e:
-            print(f"  [ERROR] HTTP エラー ({name}): {e}")
-        except Exception as e:  # noqa: BLE001
-            print(f"  [ERROR] 予期しないエラー ({name}): {e}")
-
     # カードタイプ順 → マナコスト順 → 英語名順
     rows.sort(key=lambda r: (r["_type_priority"], r["_cmc"], r["card_name_en"]))
     for row in rows: